@@ -5,7 +5,7 @@ synchrony violations, and switch queuing delays.
 """
 
 import random
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, Iterable, Optional, List
 
 class Network:
     def __init__(self, sim, config):
@@ -24,6 +24,24 @@ class Network:
         """
         self.sim = sim
         self.config = config
+        # Logger's log method, bound once (None when the simulator has no logger)
+        logger = getattr(sim, 'logger', None)
+        self._log = logger.log if logger else None
+
+        # Network parameters resolved once here instead of on every packet.
+        # Optional ones fall back to the same defaults as before.
+        self._base_delay = config.base_network_delay
+        self._jitter_rate = getattr(config, 'network_jitter', 0.0)
+        self._p_loss = config.packet_loss_rate
+        self._proc_time = getattr(config, 'switch_processing_time', 0.05)
+        self._p_sync_violate = getattr(config, 'p_sync_violate', 0.0)
+        self._sync_delay = getattr(config, 'sync_delay', 0.5)
+
+        # The simulator's RNG (own stream seeded from config.seed if the
+        # simulator has none), with its methods bound once for per-packet draws.
+        self._rng = getattr(sim, 'rng', None) or random.Random(getattr(config, 'seed', None))
+        self._rand = self._rng.random
+        self._uniform = self._rng.uniform
         
         # Keeps a list of messages if detailed tracking is needed
         self.message_history: List[Dict] = []
@@ -35,8 +53,10 @@ class Network:
         self.packets_delayed_sync = 0  
         
         # Simple queue model for each destination node.
-        # Key: node id, Value: time when its incoming link becomes free.
-        self.switch_queues: Dict[int, float] = {}
+        # Index: node id, Value: time when its incoming link becomes free.
+        # Server ids are dense (0..num_nodes-1), so a flat list avoids hashing;
+        # it grows on first use for higher ids such as clients.
+        self.switch_queues: List[float] = [0.0] * getattr(config, 'num_nodes', 0)
 
     def _sample_delay(self) -> float:
         """
@@ -45,18 +65,20 @@ class Network:
         Real datacenter networks rarely have constant latency. 
         We add a random deviation based on 'network_jitter' config.
         """
-        base = self.config.base_network_delay
+        base = self._base_delay
         
         # Jitter logic: if config has jitter, apply random variance
         # Default to 0.0 if not set in config
-        jitter_rate = getattr(self.config, 'network_jitter', 0.0)
+        jitter_rate = self._jitter_rate
         
         if jitter_rate > 0:
             jitter_range = base * jitter_rate
             # Random float between -jitter and +jitter
-            deviation = random.uniform(-jitter_range, jitter_range)
+            deviation = self._uniform(-jitter_range, jitter_range)
             # Ensure delay doesn't become negative or zero (physics constraint)
-            return max(0.1, base + deviation)
+            # (inline compare instead of max(): this runs for every packet)
+            delay = base + deviation
+            return delay if delay > 0.1 else 0.1
         
         return base
 
@@ -68,14 +90,22 @@ class Network:
         they must be processed one by one. This adds realistic congestion.
         """
         # Processing time per packet (default to 0.05ms if not in config)
-        proc_time = getattr(self.config, 'switch_processing_time', 0.05)
+        proc_time = self._proc_time
+        
+        # negative ids would index from the end of the list (another node's link)
+        if dst < 0:
+            raise ValueError(f"destination node id must be >= 0, got {dst}")
         
         # When will the destination's link be free?
-        last_free_time = self.switch_queues.get(dst, 0.0)
+        try:
+            last_free_time = self.switch_queues[dst]
+        except IndexError:
+            self.switch_queues.extend([0.0] * (dst + 1 - len(self.switch_queues)))
+            last_free_time = 0.0
         
         # The packet can be processed starting from:
         # max(when it physically arrived, when the previous packet finished)
-        start_processing = max(arrival_time, last_free_time)
+        start_processing = arrival_time if arrival_time > last_free_time else last_free_time
         
         # Packet leaves the switch after the processing time
         finish_time = start_processing + proc_time
@@ -97,11 +127,11 @@ class Network:
         self.packets_sent += 1
         
         # 1. Packet Loss Check
-        if random.random() < self.config.packet_loss_rate:
+        if self._rand() < self._p_loss:
             self.packets_dropped += 1
             # Optional logging for debug runs
-            if hasattr(self.sim, 'logger') and self.sim.logger:
-                self.sim.logger.log(src, f"Message to {dst} dropped (packet loss)", level="WARN")
+            if self._log:
+                self._log(src, f"Message to {dst} dropped (packet loss)", level="WARN")
             return
         
         # 2. Calculate Network Travel Time (Latency + Jitter)
@@ -112,13 +142,35 @@ class Network:
         final_delivery_time = self._apply_queuing_delay(dst, arrival_at_switch)
         
         # 4. Add the delivery event to the simulator
-        self.sim.schedule(final_delivery_time, "MESSAGE", dst, {
-            "src": src,
-            "msg": msg
-        })
-        
+        self.sim.schedule(final_delivery_time, "MESSAGE", dst, (src, msg))
 
 
+    def send_batch(self, src: int, dsts: Iterable[int], msg: Any) -> None:
+        """
+        Send the same message from src to several destinations.
+        
+        Behaves like calling send() once per destination (same loss, latency
+        and queuing model, same order of random draws), but the config values
+        and bound methods are looked up once for the whole batch, and all
+        deliveries share one event payload.
+        """
+        loss_rate = self._p_loss
+        rand = self._rand
+        sample_delay = self._sample_delay
+        apply_queuing = self._apply_queuing_delay
+        schedule = self.sim.schedule
+        now = self.sim.time
+        payload = (src, msg)
+        
+        for dst in dsts:
+            self.packets_sent += 1
+            if rand() < loss_rate:
+                self.packets_dropped += 1
+                if self._log:
+                    self._log(src, f"Message to {dst} dropped (packet loss)", level="WARN")
+                continue
+            schedule(apply_queuing(dst, now + sample_delay()), "MESSAGE", dst, payload)
+
     def sync_send(self, src: int, dst: int, msg: Any, timeout: Optional[float] = None) -> bool:
         """
         Send a message with synchronous semantics.
@@ -134,24 +186,24 @@ class Network:
         """
         self.packets_sent += 1
         
-        # Read sync-related parameters from the config
-        p_violate = getattr(self.config, 'p_sync_violate', 0.0)
-        base_sync_delay = getattr(self.config, 'sync_delay', 0.5)
+        # Sync-related parameters (resolved from the config in __init__)
+        p_violate = self._p_sync_violate
+        base_sync_delay = self._sync_delay
         
         actual_network_delay = base_sync_delay
         
         # 1. Check if synchrony guarantee should be violated
         # If violated, the network is "slow" and exceeds the guarantee
-        if random.random() < p_violate:
+        if self._rand() < p_violate:
             self.packets_delayed_sync += 1
             # Apply a large delay penalty (e.g., 5x - 10x slower)
-            actual_network_delay = base_sync_delay * random.uniform(5.0, 10.0)
+            actual_network_delay = base_sync_delay * self._uniform(5.0, 10.0)
             
-            if hasattr(self.sim, 'logger') and self.sim.logger:
-                self.sim.logger.log(src, f"SYNC VIOLATION to {dst}! Delay: {actual_network_delay:.2f}ms", level="WARN")
+            if self._log:
+                self._log(src, f"SYNC VIOLATION to {dst}! Delay: {actual_network_delay:.2f}ms", level="WARN")
         else:
             # Normal sync case with small random variation)
-            actual_network_delay = base_sync_delay * random.uniform(0.9, 1.0)
+            actual_network_delay = base_sync_delay * self._uniform(0.9, 1.0)
 
         # 2. Apply Queuing Logic
         # Even sync messages must pass through physical switches
@@ -165,10 +217,7 @@ class Network:
             pass # The protocol code (Node.py) will check the time and handle the timeout.
 
         # 4. Schedule the message delivery
-        self.sim.schedule(final_delivery_time, "MESSAGE", dst, {
-            "src": src,
-            "msg": msg
-        })
+        self.sim.schedule(final_delivery_time, "MESSAGE", dst, (src, msg))
         
         return True
 
@@ -1,18 +1,28 @@
-from typing import Any, Optional, Dict, List, TYPE_CHECKING
+from typing import Any, Optional, Dict, List, Sequence, TYPE_CHECKING
 from Network import Network
 from abc import ABC, abstractmethod
-import random
 
 if TYPE_CHECKING:
     from simulator import Simulator
 
 class Node(ABC):
+    # Base fields live in slots (fast, fixed-offset access). Protocol
+    # subclasses add their own state, so they still get a __dict__.
+    __slots__ = (
+        'id', 'sim', 'net', 'logger', 'store', 'timers',
+        'messages_received', 'messages_sent', 'last_checked_msgs',
+        'cpu_usage', 'memory_usage', 'disk_usage', 'power_watts',
+        'faults', 'is_critical',
+    )
+
     def __init__(self, node_id: int, sim: "Simulator", net: Network, logger=None):
         self.id = node_id
         self.sim = sim
         self.net = net
         self.logger = logger
         self.store: Dict[str, Any] = {}
+        # Deadlines of timers armed with reset_timer (one queued event each)
+        self.timers: Dict[Any, float] = {}
         
         # Metrics
         self.messages_received = 0
@@ -39,15 +49,55 @@ class Node(ABC):
         self.net.send(self.id, dst, msg)
         self.messages_sent += 1
 
+    def broadcast(self, dsts: Sequence[int], msg: Any) -> None:
+        """Send the same msg to every node in dsts (one Network.send_batch call)."""
+        self.net.send_batch(self.id, dsts, msg)
+        self.messages_sent += len(dsts)
+
     def sync_send(self, dst: int, msg: Any, timeout: Optional[float] = None) -> bool:
-        try:
-            return self.net.sync_send(self.id, dst, msg, timeout)
-        except:
-            return False
+        # no try/except: Network.sync_send does not raise, and a bare except
+        # would also swallow KeyboardInterrupt and real bugs
+        ok = self.net.sync_send(self.id, dst, msg, timeout)
+        self.messages_sent += 1
+        return ok
 
     def set_timer(self, delay: float, timer_id: Any) -> None:
-        fire_time = self.sim.time + delay
-        self.sim.schedule(fire_time, "TIMER", self.id, {"timer_id": timer_id})
+        sim = self.sim
+        sim.schedule(sim.time + delay, "TIMER", self.id, timer_id)
+
+    def reset_timer(self, delay: float, timer_id: Any) -> None:
+        """
+        Arm a timer to fire `delay` from now, or push back its deadline.
+
+        Unlike set_timer, calling this again while the timer is pending does
+        not queue another event, it only moves the deadline (later). When the
+        single queued event fires early, timer_expired() re-arms it for the
+        remaining time, so the event queue holds at most one entry per timer.
+        """
+        sim = self.sim
+        timers = self.timers
+        deadline = sim.time + delay
+        if timer_id not in timers:
+            sim.schedule(deadline, "TIMER", self.id, timer_id)
+        timers[timer_id] = deadline
+
+    def timer_expired(self, timer_id: Any) -> bool:
+        """
+        Check at the top of on_timer: False means the event is stale.
+
+        For timers armed with reset_timer whose deadline moved since the event
+        was queued, the event is re-armed and False is returned. Plain
+        set_timer timers always count as expired.
+        """
+        deadline = self.timers.get(timer_id)
+        if deadline is None:
+            return True
+        sim = self.sim
+        if sim.time < deadline:
+            sim.schedule(deadline, "TIMER", self.id, timer_id)
+            return False
+        del self.timers[timer_id]
+        return True
     
     def update_metrics(self) -> None:
         """Update metrics based on real load."""
@@ -56,7 +106,7 @@ class Node(ABC):
         
         # CPU increases with message load
         load = 5.0 + (delta * 0.5)
-        self.cpu_usage = max(5.0, min(100.0, load + random.uniform(-1, 1)))
+        self.cpu_usage = max(5.0, min(100.0, load + self.sim.rng.uniform(-1, 1)))
         
         # Memory increases with store size
         mem = 30.0 + (len(self.store) * 0.1)
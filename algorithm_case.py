@@ -1,12 +1,25 @@
-from typing import Type, Dict, Any
+import importlib
+from typing import Type, Dict, Any, Sequence, Union
 from Node import Node
 
 class AlgorithmCase:
-    def __init__(self, name: str, node_class: Type[Node], default_params: Dict[str, Any]):
+    def __init__(self, name: str, node_class: Union[Type[Node], str], default_params: Dict[str, Any]):
         self.name = name
-        self.node_class = node_class
+        # Either the class itself or a "module:Class" path that is imported on first use
+        self._node_class = node_class
         self.default_params = default_params
 
-    def create_node(self, node_id: int, sim, net, all_nodes: list[int], **overrides) -> Node:
-        params = {**self.default_params, **overrides, "all_nodes": all_nodes}
+    @property
+    def node_class(self) -> Type[Node]:
+        if isinstance(self._node_class, str):
+            module_name, _, class_name = self._node_class.partition(":")
+            self._node_class = getattr(importlib.import_module(module_name), class_name)
+        return self._node_class
+
+    def create_node(self, node_id: int, sim, net, all_nodes: Sequence[int], **overrides) -> Node:
+        if overrides:
+            params = {**self.default_params, **overrides, "all_nodes": all_nodes}
+        else:
+            # usual case (no overrides): a single merge, no empty dict to unpack
+            params = {**self.default_params, "all_nodes": all_nodes}
         return self.node_class(node_id, sim, net, **params)
\ No newline at end of file
@@ -1,24 +1,22 @@
 from typing import Dict
 from algorithm_case import AlgorithmCase
-from protocols.simple_test import SimpleTestNode
-from protocols.paxos_node import PaxosNode
-
-from protocols.primary_backup import PrimaryBackupNode
 
+# Protocol classes are given as "module:Class" paths, so a protocol module is
+# only imported when its case is actually used.
 ALGORITHM_REGISTRY: Dict[str, AlgorithmCase] = {
     "simple_test": AlgorithmCase(
         "simple_test",
-        SimpleTestNode,
+        "protocols.simple_test:SimpleTestNode",
         default_params={}
     ),
     "paxos": AlgorithmCase(
         "paxos",
-        PaxosNode,
+        "protocols.paxos_node:PaxosNode",
         default_params={}
     ),
     "primary_backup": AlgorithmCase(
         "primary_backup",
-        PrimaryBackupNode,
+        "protocols.primary_backup:PrimaryBackupNode",
         default_params={}
     ),
 }
\ No newline at end of file
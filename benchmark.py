@@ -3,24 +3,32 @@ Benchmark module for DBSIM.
 It measures TPS (transactions per second) and runs our experiments automatically.
 """
 
-import statistics
-from typing import Dict, List, Optional
-from dataclasses import dataclass, asdict, field
+import hashlib
+import heapq
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import IO, Any, Dict, List, Optional, Sequence, Tuple
+from dataclasses import astuple, dataclass, field
 from datetime import datetime
+from operator import attrgetter
 import csv
 from pathlib import Path
 
 from simulator import Simulator
 from Network import Network
 from client import Client
+from Node import Node
 from logger import Logger
 from algorithms import ALGORITHM_REGISTRY
+from algorithm_case import AlgorithmCase
 from config import Config
 
 
-@dataclass
+@dataclass(slots=True)
 class BenchmarkResult:
-    """Holds all metrics for one benchmark run."""
+    """Holds all metrics for one benchmark run (slotted: no per-instance __dict__)."""
     protocol: str
     num_nodes: int
     network_delay: float
@@ -44,75 +52,132 @@ class BenchmarkResult:
     timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
 
 
+# CSV column order, fixed by the dataclass definition
+_FIELDNAMES: Tuple[str, ...] = tuple(f.name for f in BenchmarkResult.__dataclass_fields__.values())
+
+# C-level multi-attribute fetchers (one call returns a tuple of values)
+_RESULT_FIELDS = attrgetter(*_FIELDNAMES)
+_NODE_METRICS = attrgetter('cpu_usage', 'memory_usage')
+
+
 class BenchmarkRunner:
     """Runs DBSIM experiments and collects statistics."""
     
-    def __init__(self, output_dir: str = "benchmark_results"):
+    def __init__(
+        self,
+        output_dir: str = "benchmark_results",
+        use_cache: bool = False,
+        csv_filename: Optional[str] = None,
+        write_csv: bool = True,
+        verbose: bool = True
+    ):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
+        # Per-experiment console output; errors are always shown
+        self.verbose = verbose
+        # Reuse stored results of seeded runs (see _cache_path)
+        self.use_cache = use_cache
         self.results: List[BenchmarkResult] = []
         self.logger = Logger()
+        # Failed experiments per exception type, e.g. {"KeyError": 2}
+        self.errors: Dict[str, int] = {}
+        # Read the clock once per runner: every result of this run shares the
+        # timestamp, and the default CSV file name is built from it
+        self.started = datetime.now()
+        self.run_timestamp = self.started.isoformat()
+        # Results are streamed to this CSV file (default name from the start
+        # time); it is opened with the first result and finished by close()
+        self.write_csv = write_csv
+        self.csv_filename = csv_filename or f"benchmark_results_{self.started.strftime('%Y%m%d_%H%M%S')}.csv"
+        self._csv_file: Optional[IO[str]] = None
+        self._csv_writer: Optional[Any] = None  # csv.writer, rows in _FIELDNAMES order
+        self._csv_path: Optional[Path] = None
+        self._rows_since_flush = 0
+
+    # CSV output goes through a 1 MiB buffer (the default is 8 KiB, i.e. many
+    # small write() calls) and is flushed to disk every this many rows
+    CSV_BUFFER_SIZE = 1 << 20
+    CSV_FLUSH_EVERY = 16
+
+    def _open_csv(self) -> None:
+        """Create the CSV file and write its header (on the first result)."""
+        self._csv_path = self.output_dir / self.csv_filename
+        self._csv_file = open(self._csv_path, 'w', buffering=self.CSV_BUFFER_SIZE, newline='')
+        self._csv_writer = csv.writer(self._csv_file)
+        self._csv_writer.writerow(_FIELDNAMES)
+        self._rows_since_flush = 0
+
+    def close(self) -> None:
+        """Flush and close the CSV file; call it once all experiments are done."""
+        if self._csv_file is None:
+            return
+        self._csv_file.close()
+        self._csv_file = None
+        self._csv_writer = None
+        if self.verbose:
+            print(f"\n📊 CSV written to: {self._csv_path}")
+
+    def _add_result(self, result: BenchmarkResult) -> None:
+        """
+        Keep a finished result and append it to the CSV file right away,
+        so a crash later in a long sweep does not lose finished rows.
+        """
+        self.results.append(result)
+        if not self.write_csv:
+            return
+        if self._csv_writer is None:
+            self._open_csv()
+        self._csv_writer.writerow(self._csv_row(result))
+        self._rows_since_flush += 1
+        if self._rows_since_flush >= self.CSV_FLUSH_EVERY:
+            self._csv_file.flush()
+            self._rows_since_flush = 0
     
     def run_experiment(self, config: Config, algorithm: str, inject_failure: bool = False) -> Optional[BenchmarkResult]:
         """Run a single experiment with the given configuration."""
+        # Console lines of this experiment, written with a single write at
+        # the end (no lock/flush per line; parallel workers do not interleave)
+        out = [
+            f"\n🔬 Running: {algorithm} | Nodes={config.num_nodes} | "
+            f"Loss={config.packet_loss_rate*100:.1f}% | Failure={'YES' if inject_failure else 'NO'}"
+        ]
+        failed = False
         try:
-            print(
-                f"\n🔬 Running: {algorithm} | Nodes={config.num_nodes} | "
-                f"Loss={config.packet_loss_rate*100:.1f}% | Failure={'YES' if inject_failure else 'NO'}"
-            )
-
-            # Set up simulator and network
-            sim = Simulator()
-            sim.config = config
-            net = Network(sim, config)
-            
-            # Select algorithm case from registry
+            cache_path = self._cache_path(config, algorithm, inject_failure)
+            if cache_path is not None and cache_path.exists():
+                result = self._load_cached(cache_path)
+                out.append("  (cached result)")
+                self._add_result(result)
+                out.extend(self._result_summary(result))
+                return result
+
+            # Select algorithm case from registry (before building anything)
             algo_case = ALGORITHM_REGISTRY.get(algorithm)
             if not algo_case:
-                print(f"Unknown algorithm: {algorithm}")
+                out.append(f"Unknown algorithm: {algorithm}")
+                failed = True
                 return None
-            
-            # Create protocol nodes for this experiment
-            node_ids = list(range(config.num_nodes))
-            nodes = {}
-            for nid in node_ids:
-                node = algo_case.create_node(nid, sim, net, node_ids)
-                # Initial role settings for primary-backup (Paxos does its own leader logic)
-                if algorithm == 'primary_backup':
-                    if nid == max(node_ids):
-                        node.role = 'PRIMARY'
-                    else:
-                        node.role = 'BACKUP'
-     
-                sim.register_node(nid, node)
-                nodes[nid] = node
-            
-            # Create client nodes that send requests
-            clients = []
-            for i in range(config.num_clients):
-                client_id = 1000 + i  # client ids are above server node ids
-                client = Client(client_id, sim, net, sim.logger)
-                # At the beginning client talks to node with highest id
-                client.primary_id = max(node_ids)
-                clients.append(client)
-                sim.register_node(client_id, client)
-                client.on_start()  # schedule first request in the simulator
-            
+
+            # Run constants, fixed before the simulation starts: the initial
+            # leader is the node with the highest id, and it is the crash
+            # victim when failures are injected
+            leader_id = config.num_nodes - 1
             # Total time for this experiment (longer when failures are enabled)
             max_time = config.inter_request_time * config.num_requests_per_client * 2.5
+            crash_time = max_time / 3.0
+
+            sim, net, nodes, clients = self._build_simulation(config, algorithm, algo_case, leader_id)
             
             if inject_failure:
                 # First phase: run some time to let system become stable
-                half_time = max_time / 3.0
-                sim.run(until_time=half_time)
+                sim.run(until_time=crash_time)
                 
                 # Crash leader node (usually node with max id)
-                victim_id = max(node_ids)
-                print(f"⚡ CRASH: Killing Node {victim_id} (Leader) at t={sim.time:.1f}ms")
+                victim_id = leader_id
+                out.append(f"⚡ CRASH: Killing Node {victim_id} (Leader) at t={sim.time:.1f}ms")
                 
                 # Remove crashed node from simulator so it stops getting events
-                if victim_id in sim.nodes:
-                    sim.nodes.pop(victim_id)
+                sim.unregister_node(victim_id)
                 
                 # Second phase: continue simulation after the crash
                 sim.run(until_time=max_time)
@@ -121,68 +186,180 @@ class BenchmarkRunner:
                 sim.run(until_time=max_time)
             
             # Collect metrics from simulator, clients, and nodes
-            result = self._collect_metrics(config, sim, algorithm, clients, nodes)
+            result = self._collect_metrics(config, sim, net, algorithm, clients, nodes)
+            if cache_path is not None:
+                self._store_cached(cache_path, result)
             
-            self.results.append(result)
-            self._print_result_summary(result)
+            self._add_result(result)
+            out.extend(self._result_summary(result))
             return result
             
         except Exception as e:
-            import traceback
-            print(f"❌ Error in experiment: {e}")
-            traceback.print_exc()
+            name = type(e).__name__
+            self.errors[name] = self.errors.get(name, 0) + 1
+            out.append(f"❌ Error in experiment: {name}: {e}")
+            failed = True
+            # a full traceback per failure can flood the console in long sweeps
+            if self.logger.debug_enabled:
+                import traceback
+                out.append(traceback.format_exc().rstrip())
             return None
+        finally:
+            if self.verbose or failed:
+                sys.stdout.write("\n".join(out) + "\n")
     
+    def _build_simulation(
+        self,
+        config: Config,
+        algorithm: str,
+        algo_case: AlgorithmCase,
+        leader_id: int
+    ) -> Tuple[Simulator, Network, List[Node], List[Client]]:
+        """Fresh simulator, network, protocol nodes and started clients for one run."""
+        create_node = algo_case.create_node
+
+        # Set up simulator and network
+        sim = Simulator(seed=config.seed)
+        sim.config = config
+        sim.logger.debug_enabled = self.logger.debug_enabled
+        net = Network(sim, config)
+        
+        # Create protocol nodes for this experiment (ids 0..num_nodes-1)
+        node_ids = tuple(range(config.num_nodes))
+        # ids are dense, so the list index is the node id
+        nodes: List[Node] = []
+        # Initial role settings for primary-backup (Paxos does its own leader logic)
+        is_pb = algorithm == 'primary_backup'
+        for nid in node_ids:
+            node = create_node(nid, sim, net, node_ids)
+            if is_pb:
+                node.role = 'PRIMARY' if nid == leader_id else 'BACKUP'
+ 
+            sim.register_node(nid, node)
+            nodes.append(node)
+        
+        # Create client nodes that send requests
+        clients = []
+        for i in range(config.num_clients):
+            client_id = 1000 + i  # client ids are above server node ids
+            client = Client(client_id, sim, net, sim.logger)
+            # At the beginning client talks to node with highest id
+            client.primary_id = leader_id
+            clients.append(client)
+            sim.register_node(client_id, client)
+            client.on_start()  # schedule first request in the simulator
+        
+        return sim, net, nodes, clients
+
+    def run_all(
+        self,
+        tasks: Sequence[Tuple[Config, str, bool]],
+        max_workers: Optional[int] = None
+    ) -> List[Optional[BenchmarkResult]]:
+        """
+        Run independent experiments in parallel worker processes.
+
+        Each task is a (config, algorithm, inject_failure) tuple. Results are
+        added to self.results in task order, so the CSV looks the same as
+        after calling run_experiment for each task one by one. Each result is
+        handed on as soon as every task before it has finished.
+        """
+        if max_workers is None:
+            # more than ~12 workers gives little extra speedup
+            max_workers = min(12, os.cpu_count() or 1, len(tasks))
+        if max_workers <= 1:
+            return [self.run_experiment(*task) for task in tasks]
+
+        results: List[Optional[BenchmarkResult]] = [None] * len(tasks)
+        finished = [False] * len(tasks)
+        next_index = 0  # first task whose result was not handed on yet
+        with ProcessPoolExecutor(max_workers=max_workers) as ex:
+            futures = {
+                ex.submit(
+                    _run_experiment_worker, str(self.output_dir), self.use_cache,
+                    self.verbose, self.logger.debug_enabled, self.run_timestamp, task
+                ): i
+                for i, task in enumerate(tasks)
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                results[i], errors = future.result()
+                # worker runners are thrown away, so their error counts are merged here
+                for name, n in errors.items():
+                    self.errors[name] = self.errors.get(name, 0) + n
+                finished[i] = True
+                if self.verbose:
+                    print(f"  [{done}/{len(tasks)}] finished: {tasks[i][1]}")
+                while next_index < len(tasks) and finished[next_index]:
+                    if results[next_index] is not None:
+                        self._add_result(results[next_index])
+                    next_index += 1
+
+        return results
+
+    def _cache_path(self, config: Config, algorithm: str, inject_failure: bool) -> Optional[Path]:
+        """
+        Cache file for an experiment, or None if it must not be cached.
+
+        Only seeded runs are cached: with a fixed seed the simulation is
+        deterministic, so the same config, algorithm and failure mode always
+        give the same result. The key covers every Config field. Delete the
+        .cache directory after changing simulator or protocol code.
+        """
+        if not self.use_cache or config.seed is None:
+            return None
+        key = repr((algorithm, inject_failure, astuple(config)))
+        digest = hashlib.sha256(key.encode()).hexdigest()[:32]
+        return self.output_dir / ".cache" / f"{digest}.json"
+
+    def _load_cached(self, path: Path) -> BenchmarkResult:
+        with open(path) as f:
+            result = BenchmarkResult(**json.load(f))
+        result.timestamp = self.run_timestamp  # it belongs to this run now
+        return result
+
+    def _store_cached(self, path: Path, result: BenchmarkResult) -> None:
+        path.parent.mkdir(exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({name: getattr(result, name) for name in _FIELDNAMES}, f)
+        tmp.replace(path)  # parallel workers never see a half-written file
+
     def _collect_metrics(
         self,
         config: Config,
         sim: Simulator,
+        net: Network,
         algorithm: str,
         clients: List[Client],
-        nodes: Dict
+        nodes: List[Node]
     ) -> BenchmarkResult:
         
+        # Messages the protocol nodes sent during the run: every node send goes
+        # through the network once, so take its packet counter and leave out
+        # the client requests (a handful of clients, not a pass over the nodes)
+        total_messages = net.packets_sent - sum(client.messages_sent for client in clients)
+
+        # One pass over the nodes for the resource sums
+        # (nodes may still contain objects that crashed in simulator)
+        cpu_sum = 0.0
+        mem_sum = 0.0
+        for cpu, mem in map(_NODE_METRICS, nodes):
+            cpu_sum += cpu
+            mem_sum += mem
+        num_nodes = len(nodes)
+
         # 1. Throughput calculation
-        # Count all messages that nodes sent during the run
-        total_messages = sum(getattr(node, 'messages_sent', 0) for node in nodes.values())
-        
         # Count commits with number of client replies
         total_replies = sum(client.reply_count for client in clients)
         
-        duration = sim.time if sim.time > 0 else 1
+        duration = sim.time if sim.time > 0 else 1.0  # always a float
         
         throughput_mps = total_messages / duration
         throughput_tps = (total_replies / duration) * 1000  # from per ms to per second
         
         # 2. Latency statistics from all clients
-        latencies = []
-        for client in clients:
-            if hasattr(client, 'latencies'):
-                latencies.extend(client.latencies)
-        
-        if latencies:
-            latency_stats = {
-                'min': min(latencies),
-                'max': max(latencies),
-                'avg': statistics.mean(latencies),
-                'median': statistics.median(latencies),
-                'p95': self._percentile(latencies, 95),
-                'p99': self._percentile(latencies, 99),
-            }
-        else:
-            latency_stats = {
-                'min': 0,
-                'max': 0,
-                'avg': 0,
-                'median': 0,
-                'p95': 0,
-                'p99': 0
-            }
-        
-        # 3. Resource usage values for nodes
-        # nodes dict may still contain objects that crashed in simulator
-        cpu_values = [getattr(node, 'cpu_usage', 0) for node in nodes.values()]
-        mem_values = [getattr(node, 'memory_usage', 0) for node in nodes.values()]
+        latency_stats = self._latency_stats(clients)
         
         return BenchmarkResult(
             protocol=algorithm,
@@ -205,42 +382,103 @@ class BenchmarkRunner:
                 total_replies / config.num_requests_per_client
                 if config.num_requests_per_client > 0 else 0
             ),
-            avg_cpu=statistics.mean(cpu_values) if cpu_values else 0,
-            avg_memory=statistics.mean(mem_values) if mem_values else 0
+            # 3. Resource usage averages over the nodes
+            avg_cpu=cpu_sum / num_nodes if num_nodes else 0,
+            avg_memory=mem_sum / num_nodes if num_nodes else 0,
+            timestamp=self.run_timestamp
         )
     
-    def _percentile(self, data: List[float], percentile: int) -> float:
-        if not data:
-            return 0
-        sorted_data = sorted(data)
-        idx = int(len(sorted_data) * percentile / 100)
-        return sorted_data[min(idx, len(sorted_data) - 1)]
+    def _latency_stats(self, clients: List[Client]) -> Dict[str, float]:
+        """
+        min, max, avg, median, p95 and p99 over the latencies of all clients.
+
+        Each client's samples are sorted on their own; min and max are then
+        the ends of those runs and the other order statistics are read from
+        their merge (see _order_stats), so one combined list is never built.
+        The average comes from the running sums the clients keep.
+        """
+        runs = [sorted(client.latencies) for client in clients if client.latencies]
+        n = sum(map(len, runs))
+        if not n:
+            return dict.fromkeys(('min', 'max', 'avg', 'median', 'p95', 'p99'), 0)
+        # median: the middle sample, or the mean of the two middle ones
+        mid = n // 2
+        lower_mid = mid if n % 2 else mid - 1
+        i95, i99 = self._percentile_indices(n, (95, 99))
+        at = self._order_stats(runs, (lower_mid, mid, i95, i99))
+        return {
+            'min': min(run[0] for run in runs),
+            'max': max(run[-1] for run in runs),
+            'avg': sum(client.latency_sum for client in clients) / n,
+            'median': at[mid] if n % 2 else (at[lower_mid] + at[mid]) / 2,
+            'p95': at[i95],
+            'p99': at[i99],
+        }
+
+    def _percentile_indices(self, n: int, percentiles: Sequence[int]) -> List[int]:
+        """Positions of several percentiles in a sorted sample of size n (n > 0)."""
+        indices = []
+        for p in percentiles:
+            # integer floor division: same index as int(n * p / 100) without float math
+            idx = n * p // 100
+            if idx >= n:
+                idx = n - 1
+            indices.append(idx)
+        return indices
+
+    def _order_stats(self, runs: List[List[float]], positions: Sequence[int]) -> Dict[int, float]:
+        """
+        Values at the given positions of the sorted union of sorted runs.
+
+        A single run (one client) is indexed directly. Several runs are
+        merged lazily with heapq.merge, stopping at the highest position.
+        """
+        if len(runs) == 1:
+            run = runs[0]
+            return {i: run[i] for i in positions}
+        wanted = set(positions)
+        last = max(wanted)
+        values = {}
+        for i, value in enumerate(heapq.merge(*runs)):
+            if i in wanted:
+                values[i] = value
+                if i == last:
+                    break
+        return values
     
-    def _print_result_summary(self, result: BenchmarkResult):
-        print(f"  ✓ TPS (Real Speed): {result.throughput_tps:.2f} ops/sec")
-        print(f"  ✓ Latency Avg:      {result.latency_avg:.2f} ms")
-        print(f"  ✓ Success Rate:     {result.commits} commits")
-        print(f"  ✓ Network Load:     {result.total_messages} messages")
+    def _result_summary(self, result: BenchmarkResult) -> List[str]:
+        return [
+            f"  ✓ TPS (Real Speed): {result.throughput_tps:.2f} ops/sec",
+            f"  ✓ Latency Avg:      {result.latency_avg:.2f} ms",
+            f"  ✓ Success Rate:     {result.commits} commits",
+            f"  ✓ Network Load:     {result.total_messages} messages",
+        ]
     
-    def export_csv(self, filename: Optional[str] = None):
-        if not filename:
-            filename = f"benchmark_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        
-        filepath = self.output_dir / filename
-        
-        with open(filepath, 'w', newline='') as csvfile:
-            fieldnames = [f.name for f in BenchmarkResult.__dataclass_fields__.values()]
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            for result in self.results:
-                row = asdict(result)
-                # Round float values for cleaner CSV output
-                for k, v in list(row.items()):
-                    if isinstance(v, float):
-                        row[k] = round(v, 2)
-                writer.writerow(row)
-        
-        print(f"\n📊 CSV exported to: {filepath}")
+    def _csv_row(self, result: BenchmarkResult) -> Tuple:
+        """One CSV row for a result, float values rounded for cleaner output."""
+        # BenchmarkResult is flat and slotted, so read its fields directly;
+        # a plain tuple in _FIELDNAMES order needs no per-row dict or key lookups
+        return tuple(
+            round(value, 2) if isinstance(value, float) else value
+            for value in _RESULT_FIELDS(result)
+        )
+
+
+def _run_experiment_worker(
+    output_dir: str,
+    use_cache: bool,
+    verbose: bool,
+    debug: bool,
+    run_timestamp: str,
+    task: Tuple[Config, str, bool]
+) -> Tuple[Optional[BenchmarkResult], Dict[str, int]]:
+    """Entry point of a run_all worker process (module level so it can be pickled)."""
+    config, algorithm, inject_failure = task
+    # the parent runner writes the CSV; workers only return their result
+    runner = BenchmarkRunner(output_dir, use_cache=use_cache, write_csv=False, verbose=verbose)
+    runner.logger.debug_enabled = debug
+    runner.run_timestamp = run_timestamp  # results carry the parent run's timestamp
+    return runner.run_experiment(config, algorithm, inject_failure), runner.errors
 
 
 def main():
@@ -248,27 +486,24 @@ def main():
     print("🚀 DBSIM Automated Benchmark Suite")
     print("=" * 60)
     
-    runner = BenchmarkRunner()
+    # --use-cache: reuse stored results of seeded experiments
+    runner = BenchmarkRunner(use_cache="--use-cache" in sys.argv[1:])
  
     base_config = Config()
 
-    for proto in base_config.algorithm:
-        cfg = Config(
-            num_nodes=base_config.num_nodes,
-            algorithm=base_config.algorithm
-        )
-        
-        runner.run_experiment(cfg, algorithm=proto)
-
-        cfg_fail = Config(
-            num_nodes=base_config.num_nodes,
-            algorithm=base_config.algorithm
-        )
-        
-        runner.run_experiment(cfg_fail, algorithm=proto, inject_failure=True)
-
-    runner.export_csv()
+    # run_experiment only reads the config, so all runs share base_config
+    tasks = [
+        (base_config, proto, inject_failure)
+        for proto in base_config.algorithm
+        for inject_failure in (False, True)
+    ]
+    try:
+        runner.run_all(tasks)
+    finally:
+        runner.close()
     print("\n All benchmarks completed.")
+    if runner.errors:
+        print(" Errors: " + ", ".join(f"{name} x{n}" for name, n in sorted(runner.errors.items())))
 
 
 if __name__ == "__main__":
@@ -2,7 +2,8 @@
 Client node that sends requests and measures latency.
 """
 
-from typing import Dict, Any, List
+from array import array
+from typing import Dict, Any
 from Node import Node
 from config import Config
 import random
@@ -15,24 +16,35 @@ class Client(Node):
         super().__init__(node_id, sim, net, logger)
         self.request_count = 0
         self.reply_count = 0
-        self.latencies: List[float] = []
-        self.pending_requests: Dict[int, float] = {}  # request_id -> send_time
+        self.latencies = array('d')  # packed doubles, no float object per sample
+        # Running aggregates, updated as each reply arrives
+        self.latency_sum = 0.0
+        self.latency_min = float('inf')
+        self.latency_max = 0.0
+        # Request ids are 1, 2, 3, ... so send times and reply flags are
+        # stored by position (request_id - 1) instead of in a dict
+        self._send_times = array('d')
+        self._replied = bytearray()
         self.primary_id = 0  # Assume primary is node 0
+        self._inter_request_time = 1.0  # read from the config in on_start
     
     def on_start(self) -> None:
         """Called when simulation starts - schedule first request."""
+        # the config does not change during a run, so read the interval once
+        config = getattr(self.sim, 'config', None)
+        if config:
+            self._inter_request_time = config.inter_request_time
         self._schedule_next_request()
     
     def _schedule_next_request(self) -> None:
         """Schedule the next client request."""
-        delay = self.sim.config.inter_request_time if hasattr(self.sim, 'config') and self.sim.config else 1.0
-        self.set_timer(delay, f"request_{self.request_count}")
+        # the only timer a client has; its id is just the request counter
+        self.set_timer(self._inter_request_time, self.request_count)
     
-    def on_timer(self, timer_id: str) -> None:
-        """Handle timer events."""
-        if timer_id.startswith("request_"):
-            self._send_request()
-            self._schedule_next_request()
+    def on_timer(self, timer_id: int) -> None:
+        """Handle timer events (always the next request timer)."""
+        self._send_request()
+        self._schedule_next_request()
     
     def _send_request(self) -> None:
         """Send a request to the primary."""
@@ -40,7 +52,8 @@ class Client(Node):
         request_id = self.request_count
         
         # Record send time
-        self.pending_requests[request_id] = self.sim.time
+        self._send_times.append(self.sim.time)
+        self._replied.append(0)
         
         # Create request message
         msg = {
@@ -60,15 +73,20 @@ class Client(Node):
         """Handle incoming messages."""
         if isinstance(msg, dict) and msg.get("type") == "REPLY":
             request_id = msg.get("request_id")
+            idx = request_id - 1 if isinstance(request_id, int) else -1
             
-            if request_id in self.pending_requests:
+            # only the first reply to a request we actually sent counts
+            if 0 <= idx < len(self._replied) and not self._replied[idx]:
                 # Calculate latency
-                send_time = self.pending_requests[request_id]
-                latency = self.sim.time - send_time
+                latency = self.sim.time - self._send_times[idx]
                 self.latencies.append(latency)
+                self.latency_sum += latency
+                if latency < self.latency_min:
+                    self.latency_min = latency
+                if latency > self.latency_max:
+                    self.latency_max = latency
                 self.reply_count += 1
-                
-                del self.pending_requests[request_id]
+                self._replied[idx] = 1
                 
                 if self.logger:
                     self.logger.log(self.id, f"Received reply for request {request_id}, latency={latency:.2f}")
@@ -80,9 +98,9 @@ class Client(Node):
         
         import statistics
         return {
-            "min_latency": min(self.latencies),
-            "max_latency": max(self.latencies),
-            "avg_latency": statistics.mean(self.latencies),
+            "min_latency": self.latency_min,
+            "max_latency": self.latency_max,
+            "avg_latency": self.latency_sum / len(self.latencies),
             "median_latency": statistics.median(self.latencies),
             "request_count": self.request_count,
             "reply_count": self.reply_count
@@ -1,9 +1,12 @@
-from dataclasses import dataclass,field
+from dataclasses import dataclass
+from typing import Optional
 
-@dataclass
+# frozen + slots: read-only after construction (use dataclasses.replace for
+# variants), fixed-offset attribute reads and no per-instance __dict__
+@dataclass(frozen=True, slots=True)
 class Config:
     num_nodes: int = 5
-    algorithm: list[str] = field(default_factory=lambda: ["paxos"])    
+    algorithm: tuple[str, ...] = ("paxos",)
     
     
     # Network
@@ -12,6 +15,10 @@ class Config:
     packet_loss_rate: float = 0.0
     switch_processing_time: float = 0.05 
     
+    # Paxos phase 2 (accept) quorum size; None = majority for both phases.
+    # Otherwise phase 1 needs num_nodes - q2 + 1 promises so the quorums intersect.
+    paxos_q2: Optional[int] = None
+    
     # Sync
     sync_delay: float = 0.5
     p_sync_violate: float = 0.01
@@ -21,4 +28,7 @@ class Config:
     num_requests_per_client: int = 100
     inter_request_time: float = 10.0    
     
+    # Randomness (None = fresh seed every run)
+    seed: Optional[int] = None
+    
     reset_on_error: bool = True
\ No newline at end of file
@@ -3,8 +3,11 @@ from typing import Optional
 
 
 class Logger:
-    def __init__(self):
+    def __init__(self, debug_enabled: bool = False):
         self.logs = []
+        # Console output (log lines, full tracebacks) only when set; entries
+        # are always kept in self.logs
+        self.debug_enabled = debug_enabled
     
     def log(self, node_id: int, message: str, level: str = "INFO"):
         """Log a message with timestamp."""
@@ -17,5 +20,6 @@ class Logger:
         }
         self.logs.append(log_entry)
         
-        # Print to console
-        print(f"[{node_id}] {level}: {message}")
+        # Print to console (one line per request in a benchmark, so debug only)
+        if self.debug_enabled:
+            print(f"[{node_id}] {level}: {message}")
@@ -1,80 +1,164 @@
 """
 Full Paxos implementation with Correct Message Counting.
 """
-import random
-from typing import List, Any
+from collections import namedtuple
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
 from Node import Node
 
+# Message type tags for Paxos-internal messages; small ints compare and hash
+# faster than strings. Client messages are dicts and keep "REQUEST"/"REPLY".
+HEARTBEAT, PREPARE, PROMISE, ACCEPT, ACCEPTED, COMMIT, NACK = range(7)
+
+# A value accepted under a ballot; a plain tuple underneath, so it stays
+# small, hashable and equal to the (ballot, value) pairs used as ACCEPTED keys.
+Proposal = namedtuple("Proposal", ["ballot", "value"])
+
+# A replicated command: (client_id, request_id, data); client_id -1 is a noop
+Command = Tuple[int, int, Any]
+
 class PaxosNode(Node):
+
+    # How many proposals the leader tracks in accepted_acks and in decided;
+    # the oldest entry is dropped beyond that, so both stay bounded
+    DECIDED_KEEP = 64
     
     # Message objects that we send between Paxos nodes
+    # (__slots__ keeps the many in-flight messages small, no per-instance __dict__)
     class PrepareMsg:
-        def __init__(self, ballot):
-            self.type = "PREPARE"; self.ballot = ballot
+        __slots__ = ("type", "ballot")
+        def __init__(self, ballot: int):
+            self.type = PREPARE; self.ballot = ballot
     class PromiseMsg:
-        def __init__(self, acceptor_id, ballot, accepted_prop=None):
-            self.type = "PROMISE"; self.id = acceptor_id; self.ballot = ballot; self.accepted_prop = accepted_prop
+        __slots__ = ("type", "id", "ballot", "accepted_prop")
+        def __init__(self, acceptor_id: int, ballot: int, accepted_prop: Optional[Proposal] = None):
+            self.type = PROMISE; self.id = acceptor_id; self.ballot = ballot; self.accepted_prop = accepted_prop
     class AcceptMsg:
-        def __init__(self, ballot, value):
-            self.type = "ACCEPT"; self.ballot = ballot; self.value = value
-    class LearnMsg:
-        def __init__(self, acceptor_id, ballot, value):
-            self.type = "LEARN"; self.id = acceptor_id; self.ballot = ballot; self.value = value
+        __slots__ = ("type", "ballot", "value")
+        def __init__(self, ballot: int, value: Command):
+            self.type = ACCEPT; self.ballot = ballot; self.value = value
+    class AcceptedMsg:
+        __slots__ = ("type", "id", "ballot", "value")
+        def __init__(self, acceptor_id: int, ballot: int, value: Command):
+            self.type = ACCEPTED; self.id = acceptor_id; self.ballot = ballot; self.value = value
+    class CommitMsg:
+        __slots__ = ("type", "ballot", "value")
+        def __init__(self, ballot: int, value: Command):
+            self.type = COMMIT; self.ballot = ballot; self.value = value
     class HeartbeatMsg:
-        def __init__(self, leader_id, ballot):
-            self.type = "HEARTBEAT"; self.leader_id = leader_id; self.ballot = ballot
+        __slots__ = ("type", "leader_id", "ballot")
+        def __init__(self, leader_id: int, ballot: int):
+            self.type = HEARTBEAT; self.leader_id = leader_id; self.ballot = ballot
     class NackMsg:
-        def __init__(self, ballot):
-            self.type = "NACK"; self.ballot = ballot
+        __slots__ = ("type", "ballot")
+        def __init__(self, ballot: int):
+            self.type = NACK; self.ballot = ballot
 
-    def __init__(self, node_id, sim, net, all_nodes=None, **kwargs):
+    def __init__(self, node_id: int, sim, net, all_nodes: Optional[Sequence[int]] = None, **kwargs):
         super().__init__(node_id, sim, net, logger=kwargs.get('logger'))
-        self.all_nodes = all_nodes or []
-        self.quorum_size = len(self.all_nodes) // 2 + 1
+        self.all_nodes: Sequence[int] = all_nodes or []
+        # Flexible Paxos: phase 1 and phase 2 quorums only have to intersect
+        # (q1 + q2 > N), so a smaller q2 commits with fewer ACCEPTEDs in the
+        # steady state at the cost of a larger q1 during elections. This relies
+        # on determine_value_to_propose always re-proposing the highest
+        # accepted value that a phase 1 quorum reports.
+        n = len(self.all_nodes)
+        config = getattr(self.sim, 'config', None)
+        q2 = getattr(config, 'paxos_q2', None)
+        if q2 is None:
+            self.q1_size: int = n // 2 + 1
+            self.q2_size: int = n // 2 + 1
+        elif 1 <= q2 <= n:
+            self.q1_size = n - q2 + 1
+            self.q2_size = q2
+        else:
+            raise ValueError(f"paxos_q2 must be between 1 and {n}, got {q2}")
+        # ballots of this node are id, id+N, id+2N, ... so they never clash
+        self._ballot_stride: int = len(self.all_nodes)
         
         # Local Paxos state that this node keeps in memory
         self.store.setdefault('promised_ballot', 0)  # largest prepare ballot where we already gave a promise
         self.store.setdefault('accepted_prop', None)  # last proposal that this node accepted
         self.store.setdefault('commits', 0)
+        # Hot-path copies of the above: handlers read the attributes and write
+        # through to the store, so the store stays the durable record
+        self.promised_ballot: int = self.store['promised_ballot']
+        self.accepted_prop: Optional[Proposal] = self.store['accepted_prop']
+        self.commits: int = self.store['commits']
         
-        self.is_leader = False
-        self.current_leader = None
+        self.is_leader: bool = False
+        self.current_leader: Optional[int] = None
         # self.ballot = 0
-        self.ballot = self.id  # we start ballots from our node id to avoid simple clashes
+        self.ballot: int = self.id  # we start ballots from our node id to avoid simple clashes
         
-        self.potential_commands = [] 
-        self.promises_received = {}
-        self.learn_received = {}
+        # pending commands in arrival order, keyed by (client_id, request_id)
+        # so dedupe and removal on commit are dict operations, not list scans
+        self.potential_commands: Dict[Tuple[int, int], Command] = {}
+        # per ballot in phase 1: promises seen and the highest accepted proposal
+        # among them, which is all that choosing the phase 2 value needs
+        self.promises_count: Dict[int, int] = {}
+        self.promises_best: Dict[int, Proposal] = {}
+        # highest ballot whose promise quorum already fired; ballots only grow,
+        # so one int replaces a set holding every ballot of the run
+        self.max_fired_ballot: int = -1
+        # (ballot, value) -> bitmask of acceptor ids, oldest first; trimmed to
+        # DECIDED_KEEP so proposals that never reach quorum do not pile up
+        self.accepted_acks: Dict[Tuple[int, Command], int] = {}
+        # proposals that reached quorum, oldest first (a dict used as an
+        # ordered set, trimmed to DECIDED_KEEP); their acks entry is dropped
+        self.decided: Dict[Tuple[int, Command], None] = {}
         
         # Timing configuration for election and heartbeat logic
-        self.heartbeat_interval = 50.0
-        self.election_timeout = 200.0 + random.uniform(0, 100)
+        self.heartbeat_interval: float = 50.0
+        self.election_timeout: float = 200.0 + self.sim.rng.uniform(0, 100)
         self.reset_election_timer()
 
+        # Message type -> handler, built once per role so on_message is a
+        # single lookup. Followers never act on PROMISE, so their table has
+        # no entry for it; set_leader() swaps the active table.
+        self._follower_dispatch: Dict[Any, Callable[[int, Any], None]] = {
+            HEARTBEAT: self._on_heartbeat,
+            PREPARE: self._on_prepare,
+            ACCEPT: self._on_accept,
+            ACCEPTED: self._on_accepted,
+            COMMIT: self._on_commit,
+            "REQUEST": self._on_request_follower,
+        }
+        self._leader_dispatch: Dict[Any, Callable[[int, Any], None]] = {
+            **self._follower_dispatch,
+            PROMISE: self._on_promise,
+            "REQUEST": self._on_request_leader,
+        }
+        self._dispatch = self._follower_dispatch
+
         # self.clear_file_commands()
 
 
     # Write one committed command as a new line in a text file for this node
-    def execute_command(self, command):
+    def execute_command(self, command: Any) -> None:
         # write the command to a new line of a file (named after the node id)
         filename = f"paxos_node_{self.id}_commands.txt"
         with open(filename, "a") as f:
             f.write(f"{command}\n")
 
     # Remove old commands from the file of this node so we start with a clean log
-    def clear_file_commands(self):
+    def clear_file_commands(self) -> None:
         filename = f"paxos_node_{self.id}_commands.txt"
         with open(filename, "w") as f:
             f.write("")
 
-    def reset_election_timer(self):
-        self.set_timer(self.election_timeout, "election_timer")
+    def set_leader(self, is_leader: bool) -> None:
+        """Change role and switch to the matching dispatch table."""
+        self.is_leader = is_leader
+        self._dispatch = self._leader_dispatch if is_leader else self._follower_dispatch
 
-    def start_election(self):
-        self.is_leader = True
+    def reset_election_timer(self) -> None:
+        # called on almost every message: coalesced, so no new event per call
+        self.reset_timer(self.election_timeout, "election_timer")
+
+    def start_election(self) -> None:
+        self.set_leader(True)
         self.current_leader = self.id
-        self.ballot += len(self.all_nodes) 
-        self.promises_received[self.ballot] = []
+        self.ballot += self._ballot_stride
         
         # msg = self.PrepareMsg(self.ballot)
         # for n in self.all_nodes:
@@ -82,131 +166,193 @@ class PaxosNode(Node):
         #     self.send(n, msg)
         # self.reset_election_timer()
 
-    def broadcast_prepare(self):
-        """Send a PREPARE message with the current ballot to all nodes."""
-        msg = self.PrepareMsg(self.ballot)
-        for n in self.all_nodes:
-            # we send prepare to every node through the simulator API
-            self.send(n, msg)
-        # after one round, we jump the ballot by the cluster size
-        self.ballot += len(self.all_nodes)
-
-    def broadcast_accept(self, value):
-        """Send an ACCEPT message with the chosen value to all nodes."""
-        msg = self.AcceptMsg(self.ballot, value)
-        for n in self.all_nodes:
-            # we send accept so every node can try to accept this value
-            self.send(n, msg)
-
-    def on_message(self, src: int, msg: Any):
+    def broadcast_prepare(self) -> None:
+        """Allocate a fresh ballot and send a PREPARE for it to all nodes."""
+        # jump the ballot by the cluster size *before* sending, so self.ballot
+        # is always the ballot of the round in flight
+        self.ballot += self._ballot_stride
+        # the new ballot supersedes all older ones: drop their phase 1 state,
+        # whether or not they reached quorum (_on_promise ignores them now)
+        self.promises_count.clear()
+        self.promises_best.clear()
+        # we send prepare to every node through the simulator API
+        self._broadcast(self.PrepareMsg(self.ballot))
+
+    def determine_value_to_propose(self, best: Optional[Proposal]) -> Command:
+        """Pick the value for phase 2 given the highest accepted proposal promised."""
+        # a value some acceptor already accepted must be proposed again, as
+        # Paxos requires; if it was committed before, _on_commit drops the repeat
+        if best is not None:
+            return best.value
+        # otherwise take the oldest pending command; if we have nothing, we send a noop
+        if self.potential_commands:
+            return next(iter(self.potential_commands.values()))
+        return (-1, -1, f"noop_{self.ballot}")
+
+    def broadcast_accept(self, ballot: int, value: Command) -> None:
+        """Send an ACCEPT message for a promised ballot with the chosen value to all nodes."""
+        # we send accept so every node can try to accept this value
+        self._broadcast(self.AcceptMsg(ballot, value))
+
+    def _broadcast(self, msg: Any) -> None:
+        """Send msg to every node, including ourselves (we vote too)."""
+        self.broadcast(self.all_nodes, msg)
+
+    def on_message(self, src: int, msg: Any) -> None:
         self.messages_received += 1
         
-        if isinstance(msg, dict):
-            mtype = msg.get("type")
+        # client messages are dicts, Paxos messages all carry .type
+        mtype = msg.get("type") if isinstance(msg, dict) else msg.type
+
+        # one dict lookup instead of walking an if/elif chain per message
+        handler = self._dispatch.get(mtype)
+        if handler is not None:
+            handler(src, msg)
+
+    def _on_heartbeat(self, src: int, msg: Any) -> None:
+        """React to HEARTBEAT messages from the current leader."""
+        if msg.ballot >= self.promised_ballot:
+            self.promised_ballot = self.store['promised_ballot'] = msg.ballot
+            self.current_leader = msg.leader_id
+            self.reset_election_timer()
+            if self.is_leader and msg.leader_id != self.id:
+                self.set_leader(False)
+
+    def _on_prepare(self, src: int, msg: Any) -> None:
+        """Handle PREPARE messages when we are in the acceptor role."""
+        if msg.ballot > self.promised_ballot:
+            self.promised_ballot = self.store['promised_ballot'] = msg.ballot
+            self.current_leader = src
+            self.reset_election_timer()
+            reply = self.PromiseMsg(self.id, msg.ballot, self.accepted_prop)
+            # send back a PROMISE to the node that started this prepare
+            self.send(src, reply)
         else:
-            mtype = getattr(msg, 'type', None)
-
-        # React to HEARTBEAT messages from the current leader
-        if mtype == "HEARTBEAT":
-            if msg.ballot >= self.store['promised_ballot']:
-                self.store['promised_ballot'] = msg.ballot
-                self.current_leader = msg.leader_id
-                self.reset_election_timer()
-                if self.is_leader and msg.leader_id != self.id:
-                    self.is_leader = False
-
-        # Handle PREPARE messages when we are in the acceptor role
-        elif mtype == "PREPARE":
-            if msg.ballot > self.store['promised_ballot']:
-                self.store['promised_ballot'] = msg.ballot
-                self.current_leader = src
-                self.reset_election_timer()
-                reply = self.PromiseMsg(self.id, msg.ballot, self.store['accepted_prop'])
-                # send back a PROMISE to the node that started this prepare
-                self.send(src, reply)
-            else:
-                # reply with NACK and tell the proposer about our higher ballot
-                self.send(src, self.NackMsg(self.store['promised_ballot']))
-
-        # Handle PROMISE messages when we are the leader
-        elif mtype == "PROMISE":
-            if not self.is_leader: return
-            if msg.ballot not in self.promises_received: self.promises_received[msg.ballot] = []
-            self.promises_received[msg.ballot].append(msg)
-            
-            # we continue only when we see a full quorum of promises
-            if len(self.promises_received[msg.ballot]) != self.quorum_size:
-                return
-
-            # choose the value to propose; if we have nothing, we send a noop
-            if self.potential_commands:
-                val = self.potential_commands[0]
-            else:
-                val = (-1, -1, f"noop_{self.ballot}")
+            # reply with NACK and tell the proposer about our higher ballot
+            self.send(src, self.NackMsg(self.promised_ballot))
+
+    def _on_promise(self, src: int, msg: Any) -> None:
+        """Handle PROMISE messages when we are the leader (leader table only)."""
+        # late promises for a ballot that already reached quorum are ignored,
+        # and so are those for ballots a newer prepare has superseded
+        ballot = msg.ballot
+        if ballot <= self.max_fired_ballot or ballot < self.ballot: return
+        count = self.promises_count.get(ballot, 0) + 1
+        self.promises_count[ballot] = count
+
+        # keep the highest accepted proposal as promises arrive,
+        # so reaching quorum does not need another pass over them
+        prop = msg.accepted_prop
+        if prop is not None:
+            best = self.promises_best.get(ballot)
+            if best is None or prop.ballot > best.ballot:
+                self.promises_best[ballot] = prop
+        
+        # we continue only when we see a full quorum of promises
+        if count < self.q1_size:
+            return
+        self.max_fired_ballot = ballot
+        del self.promises_count[ballot]
+        best = self.promises_best.pop(ballot, None)
+
+        # phase 2 runs under the ballot the acceptors promised, not a later one
+        self.broadcast_accept(ballot, self.determine_value_to_propose(best))
+        self.reset_timer(self.heartbeat_interval, "heartbeat_timer")
+
+    def _on_accept(self, src: int, msg: Any) -> None:
+        """Handle ACCEPT messages as an acceptor node."""
+        if msg.ballot >= self.promised_ballot:
+            self.promised_ballot = self.store['promised_ballot'] = msg.ballot
+            self.accepted_prop = self.store['accepted_prop'] = Proposal(msg.ballot, msg.value)
+            self.current_leader = src
+            self.reset_election_timer()
             
-            self.broadcast_accept(val)
-            self.set_timer(self.heartbeat_interval, "heartbeat_timer")
-
-        # Handle ACCEPT messages as an acceptor node
-        elif mtype == "ACCEPT":
-            if msg.ballot >= self.store['promised_ballot']:
-                self.store['promised_ballot'] = msg.ballot
-                self.store['accepted_prop'] = (msg.ballot, msg.value)
-                self.current_leader = src
-                self.reset_election_timer()
-                
-                reply = self.LearnMsg(self.id, msg.ballot, msg.value)
-                for n in self.all_nodes:
-                    # send LEARN so all nodes can see that we accepted this value
-                    self.send(n, reply)
-
-        # Handle LEARN messages when nodes count accepted values
-        elif mtype == "LEARN":
-            prop = (msg.ballot, msg.value)
-            if prop not in self.learn_received: self.learn_received[prop] = set()
-            self.learn_received[prop].add(msg.id)
-
-            # we wait until enough acceptors report the same value
-            if len(self.learn_received[prop]) != self.quorum_size:
-                return
-
-            committed_val = msg.value
-
-            # we could log this command to a file if we want external trace
-            # self.execute_command(committed_val[2])
-
-            if committed_val in self.potential_commands:
-                self.potential_commands.remove(committed_val)
-                self.store['commits'] = self.store.get('commits', 0) + 1
-                
-                client_id, req_id, _ = committed_val
-                if client_id >= 0:
-                    reply = {
-                        "type": "REPLY",
-                        "request_id": req_id,
-                        "status": "COMMITTED"
-                    }
-                    self.send(client_id, reply)
-
-        # Handle client REQUEST messages, either as leader or follower
-        elif mtype == "REQUEST":
-            if self.is_leader:
-                cmd_tuple = (msg["client_id"], msg["request_id"], msg["data"])
-                if cmd_tuple not in self.potential_commands:
-                    self.potential_commands.append(cmd_tuple)
-                    # we start a new prepare round for this command
-                    self.broadcast_prepare()
-                    
-            elif self.current_leader is not None:
-                # if we are not leader, we just forward the request to the leader
-                self.send(self.current_leader, msg)
-
-    def on_timer(self, timer_id):
+            # only the proposer counts acceptances (phase 2b): one reply to it
+            # instead of every acceptor telling every node (N vs N*N messages)
+            self.send(src, self.AcceptedMsg(self.id, msg.ballot, msg.value))
+
+    def _on_accepted(self, src: int, msg: Any) -> None:
+        """Count ACCEPTED replies for a ballot we proposed; at quorum, COMMIT it."""
+        # in both tables: a proposer that lost leadership meanwhile can still
+        # finish its round, the quorum of acceptances makes the value chosen
+        prop = (msg.ballot, msg.value)
+        if prop in self.decided: return
+        # one bit per acceptor id: a duplicate ACCEPTED sets the same bit again,
+        # and there is no set to allocate or hash into per proposal
+        accepted_acks = self.accepted_acks
+        acks = accepted_acks.get(prop, 0) | (1 << msg.id)
+        accepted_acks[prop] = acks
+        if len(accepted_acks) > self.DECIDED_KEEP:
+            del accepted_acks[next(iter(accepted_acks))]
+
+        # we wait until enough acceptors report the same value
+        if acks.bit_count() < self.q2_size:
+            return
+
+        # the mask is not needed after quorum; remember only that it was decided
+        # so the remaining ACCEPTEDs do not open a new entry
+        del accepted_acks[prop]
+        decided = self.decided
+        decided[prop] = None
+        if len(decided) > self.DECIDED_KEEP:
+            del decided[next(iter(decided))]
+
+        # tell every node (ourselves included) the value is chosen
+        self._broadcast(self.CommitMsg(msg.ballot, msg.value))
+
+    def _on_commit(self, src: int, msg: Any) -> None:
+        """Apply a chosen value and reply to its client if we hold the request."""
+        committed_val = msg.value
+
+        # every command goes through the same slot: once a value is chosen,
+        # the acceptor forgets it so the next round can choose a new one
+        # (acceptors that miss this COMMIT report it again, see below)
+        prop = self.accepted_prop
+        if prop is not None and prop.value == committed_val:
+            self.accepted_prop = self.store['accepted_prop'] = None
+
+        # we could log this command to a file if we want external trace
+        # self.execute_command(committed_val[2])
+
+        # dedup happens here, not when proposing: a value chosen again is
+        # no longer pending, so it is neither counted nor replied twice
+        if self.potential_commands.pop(committed_val[:2], None) is None:
+            # that round went to a repeat; start another for what is still pending
+            if self.is_leader and self.potential_commands:
+                self.broadcast_prepare()
+            return
+        self.commits += 1
+        self.store['commits'] = self.commits
+        
+        client_id, req_id, _ = committed_val
+        if client_id >= 0:
+            reply = {
+                "type": "REPLY",
+                "request_id": req_id,
+                "status": "COMMITTED"
+            }
+            self.send(client_id, reply)
+
+    def _on_request_leader(self, src: int, msg: Any) -> None:
+        """Handle client REQUEST messages as the leader."""
+        key = (msg["client_id"], msg["request_id"])
+        if key not in self.potential_commands:
+            self.potential_commands[key] = (*key, msg["data"])
+            # we start a new prepare round for this command
+            self.broadcast_prepare()
+
+    def _on_request_follower(self, src: int, msg: Any) -> None:
+        """Handle client REQUEST messages as a follower."""
+        if self.current_leader is not None:
+            # if we are not leader, we just forward the request to the leader
+            self.send(self.current_leader, msg)
+
+    def on_timer(self, timer_id: str) -> None:
+        # deadline was pushed back since this event was queued
+        if not self.timer_expired(timer_id): return
         if timer_id == "election_timer":
             if not self.is_leader: self.start_election()
             else: self.reset_election_timer()
         elif timer_id == "heartbeat_timer" and self.is_leader:
-            msg = self.HeartbeatMsg(self.id, self.ballot)
-            for n in self.all_nodes:
-                    self.send(n, msg)
-            self.set_timer(self.heartbeat_interval, "heartbeat_timer")
+            self._broadcast(self.HeartbeatMsg(self.id, self.ballot))
+            self.reset_timer(self.heartbeat_interval, "heartbeat_timer")
@@ -5,15 +5,22 @@ Primary-backup replication protocol node with simple message objects.
 from typing import Any, Dict, List
 from Node import Node
 
+# Message type tags for messages between replicas; small ints compare and hash
+# faster than strings. Client messages are dicts and keep "REQUEST"/"REPLY".
+HEARTBEAT, REPLICATE, ACK = range(3)
+
 class PrimaryBackupNode(Node):
     
     # Message classes that we send between primary and backups
+    # (__slots__ keeps the many in-flight messages small, no per-instance __dict__)
     class HeartbeatMsg:
+        __slots__ = ("type", "primary_id")
         def __init__(self, primary_id):
-            self.type = "HEARTBEAT"
+            self.type = HEARTBEAT
             self.primary_id = primary_id
 
     class RequestMsg:
+        __slots__ = ("type", "client_id", "request_id", "data")
         def __init__(self, client_id, request_id, data):
             self.type = "REQUEST"
             self.client_id = client_id
@@ -21,19 +28,26 @@ class PrimaryBackupNode(Node):
             self.data = data
 
     class ReplicateMsg:
+        __slots__ = ("type", "request_id", "data")
         def __init__(self, request_id, data):
-            self.type = "REPLICATE"
+            self.type = REPLICATE
             self.request_id = request_id
             self.data = data
 
     class AckMsg:
+        __slots__ = ("type", "request_id")
         def __init__(self, request_id):
-            self.type = "ACK"
+            self.type = ACK
             self.request_id = request_id
 
     def __init__(self, node_id: int, sim, net, all_nodes=None, **kwargs):
         super().__init__(node_id, sim, net, logger=kwargs.get('logger'))
         self.all_nodes = all_nodes or []
+        # Computed once: everyone except us, the initial primary, and its successor
+        self.peers = tuple(n for n in self.all_nodes if n != self.id)
+        ordered = sorted(self.all_nodes)
+        self.initial_primary = ordered[-1]
+        self.failover_id = ordered[-2] if len(ordered) > 1 else None
 
         # Local state for the replicated data and protocol role
         self.data: List[Any] = []
@@ -41,15 +55,23 @@ class PrimaryBackupNode(Node):
         self.current_primary = None
         self.pending_requests: Dict[int, Dict] = {}  # maps request_id to a small dict with client_id, acks, and data
 
+        # Message type -> handler, built once so on_message is a single lookup
+        self._dispatch = {
+            HEARTBEAT: self._on_heartbeat,
+            "REQUEST": self._on_request,
+            REPLICATE: self._on_replicate,
+            ACK: self._on_ack,
+        }
+
         # Timer values for heartbeats and primary election
         self.heartbeat_interval = 50.0
         self.election_timeout = 150.0
 
         # At startup we choose the node with the biggest id as the first primary
-        if self.id == max(self.all_nodes):
+        if self.id == self.initial_primary:
             self.become_primary()
         else:
-            self.current_primary = max(self.all_nodes)
+            self.current_primary = self.initial_primary
             self.reset_election_timer()
 
     # Switch this node to PRIMARY role and start sending heartbeats
@@ -58,25 +80,22 @@ class PrimaryBackupNode(Node):
         self.current_primary = self.id
         self.pending_requests = {}
         self.send_heartbeat()
-        self.set_timer(self.heartbeat_interval, "heartbeat_timer")
+        self.reset_timer(self.heartbeat_interval, "heartbeat_timer")
 
     def reset_election_timer(self):
-        self.set_timer(self.election_timeout, "election_timer")
+        # called on every heartbeat/replicate: coalesced, so no new event per call
+        self.reset_timer(self.election_timeout, "election_timer")
 
     # Send a heartbeat to every other node so they know who is primary
     def send_heartbeat(self):
-        msg = self.HeartbeatMsg(self.id)
-        for n in self.all_nodes:
-            if n != self.id:
-                self.send(n, msg)
-        self.set_timer(self.heartbeat_interval, "heartbeat_timer")
+        self.broadcast(self.peers, self.HeartbeatMsg(self.id))
+        self.reset_timer(self.heartbeat_interval, "heartbeat_timer")
 
     # Primary sends the update to all backups using synchronous send
     def replicate_to_backups(self, req_id, data):
         msg = self.ReplicateMsg(req_id, data)
-        for n in self.all_nodes:
-            if n != self.id:
-                self.sync_send(n, msg)
+        for n in self.peers:
+            self.sync_send(n, msg)
 
     # When we have enough ACKs, we commit the request and reply to the client
     def commit_and_reply(self, req_id):
@@ -95,62 +114,60 @@ class PrimaryBackupNode(Node):
     def on_message(self, src: int, msg: Any):
         self.messages_received += 1
 
-        if isinstance(msg, dict):
-            mtype = msg.get("type")
-            class MsgWrapper:
-             def __init__(self, d):
-                self.type = d.get("type")
-                self.__dict__.update(d)
-            msg = MsgWrapper(msg)
-        else:
-          mtype = getattr(msg, "type", None)
-          if mtype is None:
-            return 
-
-        # 1) handle HEARTBEAT: we update who we think is primary
-        if mtype == "HEARTBEAT":
-            if msg.primary_id >= (self.current_primary or -1):
-                self.current_primary = msg.primary_id
-                self.role = 'BACKUP'
-                self.reset_election_timer()
+        # client messages are dicts, our own messages are objects with .type
+        mtype = msg.get("type") if isinstance(msg, dict) else msg.type
+
+        # one dict lookup instead of walking an if/elif chain per message
+        handler = self._dispatch.get(mtype)
+        if handler is not None:
+            handler(src, msg)
 
-        # 2) handle REQUEST: primary processes it, backups forward to primary
-        elif mtype == "REQUEST":
-            if self.role == 'PRIMARY':
-                req_id = msg.request_id
-                self.pending_requests[req_id] = {
-                    "client_id": msg.client_id,
-                    "data": msg.data,
-                    "acks": set()
-                }
-                self.replicate_to_backups(req_id, msg.data)
-            elif self.current_primary is not None:
-                self.send(self.current_primary, msg)
-
-        # 3) handle REPLICATE on backups: apply data and send ACK back
-        elif mtype == "REPLICATE":
-            self.data.append(msg.data)
-            ack_msg = self.AckMsg(msg.request_id)
-            self.send(src, ack_msg)
+    # 1) handle HEARTBEAT: we update who we think is primary
+    def _on_heartbeat(self, src: int, msg: Any):
+        if msg.primary_id >= (self.current_primary or -1):
+            self.current_primary = msg.primary_id
+            self.role = 'BACKUP'
             self.reset_election_timer()
 
-        # 4) handle ACK on the primary: when all backups answer, we commit
-        elif mtype == "ACK":
-            if self.role == 'PRIMARY':
-                req_id = msg.request_id
-                if req_id in self.pending_requests:
-                    self.pending_requests[req_id]["acks"].add(src)
-                    needed = len(self.all_nodes) - 1
-                    if len(self.pending_requests[req_id]["acks"]) >= needed:
-                        self.commit_and_reply(req_id)
+    # 2) handle REQUEST (a client dict): primary processes it, backups forward to primary
+    def _on_request(self, src: int, msg: Dict):
+        if self.role == 'PRIMARY':
+            req_id = msg["request_id"]
+            self.pending_requests[req_id] = {
+                "client_id": msg["client_id"],
+                "data": msg["data"],
+                "acks": set()
+            }
+            self.replicate_to_backups(req_id, msg["data"])
+        elif self.current_primary is not None:
+            self.send(self.current_primary, msg)
+
+    # 3) handle REPLICATE on backups: apply data and send ACK back
+    def _on_replicate(self, src: int, msg: Any):
+        self.data.append(msg.data)
+        ack_msg = self.AckMsg(msg.request_id)
+        self.send(src, ack_msg)
+        self.reset_election_timer()
+
+    # 4) handle ACK on the primary: when all backups answer, we commit
+    def _on_ack(self, src: int, msg: Any):
+        if self.role == 'PRIMARY':
+            req_id = msg.request_id
+            if req_id in self.pending_requests:
+                self.pending_requests[req_id]["acks"].add(src)
+                if len(self.pending_requests[req_id]["acks"]) >= len(self.peers):
+                    self.commit_and_reply(req_id)
 
     # Timers for periodic heartbeat and simple failover
     def on_timer(self, timer_id):
+        # deadline was pushed back since this event was queued
+        if not self.timer_expired(timer_id):
+            return
         if timer_id == "heartbeat_timer" and self.role == 'PRIMARY':
             self.send_heartbeat()
         elif timer_id == "election_timer" and self.role == 'BACKUP':
             # If we are the second largest id and we do not see a primary, we take over
-            if self.id == sorted(self.all_nodes)[-2]:
+            if self.id == self.failover_id:
                 self.become_primary()
             else:
                 self.reset_election_timer()
@@ -11,13 +11,18 @@ class SimpleTestNode(Node):
     def __init__(self, node_id, sim, net, all_nodes=None, **kwargs):
         super().__init__(node_id, sim, net, logger=kwargs.get('logger'))
         self.all_nodes = all_nodes or []
+        # Log through the node's logger, or the simulator's if none was given;
+        # Logger prints only when debug_enabled is set
+        logger = self.logger or getattr(sim, 'logger', None)
+        self._log = logger.log if logger else None
         
     def on_message(self, src, msg):
         """Handle incoming message"""
         self.messages_received += 1
         self.state = "processing"
         
-        print(f"Node {self.id} received message from {src}: {msg}")
+        if self._log:
+            self._log(self.id, f"Received message from {src}: {msg}")
         
         # Check if this is a replicate message - don't replicate again
         if isinstance(msg, dict) and msg.get("type") == "replicate":
@@ -29,10 +34,8 @@ class SimpleTestNode(Node):
         self.messages_sent += 1
         
         # Broadcast to all other nodes ONLY for original requests
-        for node_id in self.all_nodes:
-            if node_id != self.id:
-                self.net.send(self.id, node_id, {"type": "replicate", "data": msg})
-                self.messages_sent += 1
+        peers = [node_id for node_id in self.all_nodes if node_id != self.id]
+        self.broadcast(peers, {"type": "replicate", "data": msg})
         
         self.state = "IDLE"
     
@@ -3,28 +3,60 @@ Core simulation engine that manages time, events, and node interactions.
 """
 
 import heapq
-from dataclasses import dataclass, field
-from typing import Any, Callable, Dict, List, Optional, TYPE_CHECKING
+import random
+from collections.abc import Mapping
+from dataclasses import dataclass
+from itertools import count
+from typing import Any, Callable, Iterator, List, Optional, Tuple, TYPE_CHECKING
 from Node import Node
 
 if TYPE_CHECKING:
     from config import Config
 
-@dataclass(order=True)
+@dataclass(slots=True)
 class Event:
+    # Never compared: the queue holds (time, seq, event) tuples, so heapq
+    # orders by the float and int in C instead of calling Event.__lt__
     time: float
-    seq: int
-    kind: str = field(compare=False)       # "MESSAGE" | "TIMER"
-    node_id: int = field(compare=False)
-    data: Dict[str, Any] = field(compare=False)
+    kind: str       # "MESSAGE" | "TIMER"
+    node_id: int
+    data: Any       # (src, msg) for MESSAGE, timer_id for TIMER
+
+
+class _NodeView(Mapping):
+    """Read-only id -> node mapping over the simulator's node list."""
+    __slots__ = ("_list",)
+
+    def __init__(self, node_list: List[Optional["Node"]]):
+        self._list = node_list
+
+    def __getitem__(self, node_id: int) -> "Node":
+        # no negative indexing: -1 must not mean "the last node"
+        if node_id < 0 or node_id >= len(self._list) or self._list[node_id] is None:
+            raise KeyError(node_id)
+        return self._list[node_id]
+
+    def __iter__(self) -> Iterator[int]:
+        return (i for i, node in enumerate(self._list) if node is not None)
+
+    def __len__(self) -> int:
+        return sum(node is not None for node in self._list)
 
 
 class Simulator:
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None):
         self.time: float = 0.0
-        self._queue: List[Event] = []
-        self._next_seq: int = 0
-        self.nodes: Dict[int, "Node"] = {}
+        # One RNG for the whole run (network, protocols, metrics); a fixed
+        # seed replays the same simulation
+        self.rng = random.Random(seed)
+        # (time, seq, event); seq breaks time ties in scheduling (FIFO) order
+        self._queue: List[Tuple[float, int, Event]] = []
+        self._seq = count()
+        # Nodes indexed by id (None = no node): ids are small ints, so a list
+        # index is cheaper than a hash probe. This is the only registry;
+        # nodes is a read-only view of it (use register_node/unregister_node)
+        self._node_list: List[Optional["Node"]] = []
+        self.nodes: Mapping = _NodeView(self._node_list)
         
         # Metrics and logger
         from logger import Logger
@@ -33,36 +65,54 @@ class Simulator:
         self.metrics: Optional[Any] = None
 
     def register_node(self, node_id: int, node: "Node") -> None:
-        self.nodes[node_id] = node
+        if node_id < 0:
+            raise ValueError(f"node id must be >= 0, got {node_id}")
+        node_list = self._node_list
+        if node_id >= len(node_list):
+            node_list.extend([None] * (node_id + 1 - len(node_list)))
+        node_list[node_id] = node
+
+    def unregister_node(self, node_id: int) -> None:
+        """Remove a node (e.g. a crash); events addressed to it are dropped."""
+        if 0 <= node_id < len(self._node_list):
+            self._node_list[node_id] = None
+
+    def schedule(self, time: float, kind: str, node_id: int, data: Any) -> None:
+        """Schedule an event at a specific time.
 
-    def schedule(self, time: float, kind: str, node_id: int, data: Dict[str, Any]) -> None:
-        """Schedule an event at a specific time."""
-        event = Event(time=time, seq=self._next_seq, kind=kind, node_id=node_id, data=data)
-        self._next_seq += 1
-        heapq.heappush(self._queue, event)
+        data is a (src, msg) tuple for MESSAGE events and the timer id for
+        TIMER events; a tuple is cheaper to build than a dict per packet.
+        """
+        heapq.heappush(self._queue, (time, next(self._seq), Event(time, kind, node_id, data)))
 
     def run(self, until_time: Optional[float] = None) -> None:
         """Run the simulation until until_time or until queue is empty."""
         while self._queue:
-            ev = heapq.heappop(self._queue)
+            entry = heapq.heappop(self._queue)
             
-            if until_time is not None and ev.time > until_time:
+            if until_time is not None and entry[0] > until_time:
                 # Put it back and stop
-                heapq.heappush(self._queue, ev)
+                heapq.heappush(self._queue, entry)
                 break
             
-            self.time = ev.time
-            self._dispatch(ev)
+            self.time = entry[0]
+            self._dispatch(entry[2])
 
     def _dispatch(self, ev: Event) -> None:
         """Dispatch an event to the appropriate handler."""
-        node = self.nodes.get(ev.node_id)
-        if not node:
+        node_id = ev.node_id
+        # negative ids would index from the end of the list: no such node
+        if node_id < 0:
+            return
+        try:
+            node = self._node_list[node_id]
+        except IndexError:
+            return
+        if node is None:
             return
 
         if ev.kind == "MESSAGE":
-            src = ev.data.get("src")
-            msg = ev.data.get("msg")
+            src, msg = ev.data
             node.on_message(src, msg)
             # Record in message history
             # self.message_history.append({
@@ -73,8 +123,7 @@ class Simulator:
             # })
 
         elif ev.kind == "TIMER":
-            timer_id = ev.data.get("timer_id")
-            node.on_timer(timer_id)
+            node.on_timer(ev.data)
 
         else:
             raise ValueError(f"Unknown event kind: {ev.kind}")